@@ -0,0 +1,10 @@
+/**
+ * lib/constants.ts
+ * Shared constants - no imports, no side effects
+ */
+
+/**
+ * Embedding model for queries. Phase 1 records the model used for the
+ * chunks (`embedding_model`) and the retriever checks it against this.
+ */
+export const EMBEDDING_MODEL = "text-embedding-004";
@@ -9,6 +9,7 @@
  */
 
 import { GoogleGenAI } from '@google/genai';
+import { EMBEDDING_MODEL } from './constants';
 
 // Initialize Gemini client
 const genAI = new GoogleGenAI({
@@ -22,7 +23,7 @@ const genAI = new GoogleGenAI({
 export async function embedText(text: string): Promise<number[]> {
   try {
     const result = await genAI.models.embedContent({
-      model: "text-embedding-004",
+      model: EMBEDDING_MODEL,
       contents: [{ role: "user", parts: [{ text }] }],
     });
     
@@ -9,6 +9,7 @@
 
 import fs from 'fs';
 import path from 'path';
+import { EMBEDDING_MODEL } from './constants';
 
 export interface Chunk {
   chunk_id: string;
@@ -17,9 +18,20 @@ export interface Chunk {
   token_count: number;
   embedding: number[];
   embedding_dim: number;
+  embedding_model?: string;
   is_premium_table?: boolean;
 }
 
+/**
+ * On-disk record: Phase 1 writes either float vectors (`embedding`)
+ * or int8-quantized ones (`embedding_q8` + `embedding_scale`)
+ */
+interface StoredChunk extends Omit<Chunk, 'embedding'> {
+  embedding?: number[];
+  embedding_q8?: number[];
+  embedding_scale?: number;
+}
+
 export interface RetrievedChunk {
   chunk_id: string;
   section: string;
@@ -38,7 +50,31 @@ export function loadEmbeddings(): Chunk[] {
   }
   
   const data = fs.readFileSync(embeddingsPath, 'utf-8');
-  return JSON.parse(data);
+  const stored: StoredChunk[] = JSON.parse(data);
+  
+  // Query and chunk vectors must come from the same model
+  // (records without the field predate it and were always Gemini)
+  const model = stored[0]?.embedding_model ?? EMBEDDING_MODEL;
+  if (model !== EMBEDDING_MODEL) {
+    throw new Error(
+      `Embeddings were generated with "${model}", but queries are embedded with ` +
+      `"${EMBEDDING_MODEL}". Re-run Phase 1 (scripts/embed_generator.py).`
+    );
+  }
+  
+  return stored.map(({ embedding_q8, embedding_scale, ...chunk }) => ({
+    ...chunk,
+    embedding: embedding_q8
+      ? dequantize(embedding_q8, embedding_scale ?? 1)
+      : chunk.embedding ?? [],
+  }));
+}
+
+/**
+ * Recover approximate float vector from int8 values + per-vector scale
+ */
+function dequantize(q: number[], scale: number): number[] {
+  return q.map(value => value * scale);
 }
 
 /**
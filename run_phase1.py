@@ -2,10 +2,14 @@
 """
 Master Script: Run Complete Phase 1 Pipeline
 Executes all Phase 1 scripts in order
+(in-process by default; --subprocess runs each script separately)
 """
 
+import argparse
+import importlib
 import subprocess
 import sys
+import traceback
 from pathlib import Path
 
 def run_command(command: str, description: str):
@@ -29,6 +33,25 @@ def run_command(command: str, description: str):
         print(f"Error: {e}")
         return False
 
+def run_stage(module_name: str, description: str):
+    """Run a pipeline script's main() in this process and handle errors"""
+    print(f"\n{'='*60}")
+    print(f"🚀 {description}")
+    print(f"{'='*60}\n")
+    
+    try:
+        # Imports are shared across stages (tiktoken, genai load once)
+        module = importlib.import_module(module_name)
+        module.main()
+        print(f"\n✅ {description} - SUCCESS")
+        return True
+    except Exception as e:
+        # Same traceback on stderr the subprocess path would have shown
+        traceback.print_exc()
+        print(f"\n❌ {description} - FAILED")
+        print(f"Error: {e}")
+        return False
+
 def check_prerequisites():
     """Check if all prerequisites are met"""
     print("\n🔍 Checking prerequisites...\n")
@@ -58,6 +81,14 @@ def check_prerequisites():
     return True
 
 def main():
+    parser = argparse.ArgumentParser(description="Run the Phase 1 pipeline")
+    parser.add_argument(
+        "--subprocess",
+        action="store_true",
+        help="run each step as a separate python process (old behaviour)"
+    )
+    args = parser.parse_args()
+    
     print("""
 ╔═══════════════════════════════════════════════════════════╗
 ║                                                           ║
@@ -73,15 +104,21 @@ def main():
     
     # Define pipeline steps
     steps = [
-        ("python scripts/pdf_parser.py", "Step 1/4: PDF Parsing"),
-        ("python scripts/text_cleaner.py", "Step 2/4: Text Cleaning"),
-        ("python scripts/chunker.py", "Step 3/4: Clause-Aware Chunking"),
-        ("python scripts/embed_generator.py", "Step 4/4: Embedding Generation"),
+        ("scripts.pdf_parser", "Step 1/4: PDF Parsing"),
+        ("scripts.text_cleaner", "Step 2/4: Text Cleaning"),
+        ("scripts.chunker", "Step 3/4: Clause-Aware Chunking"),
+        ("scripts.embed_generator", "Step 4/4: Embedding Generation"),
     ]
     
     # Run pipeline
-    for command, description in steps:
-        if not run_command(command, description):
+    for module_name, description in steps:
+        if args.subprocess:
+            command = f"python {module_name.replace('.', '/')}.py"
+            ok = run_command(command, description)
+        else:
+            ok = run_stage(module_name, description)
+        
+        if not ok:
             print(f"\n💥 Pipeline failed at: {description}")
             sys.exit(1)
     
@@ -5,19 +5,35 @@ Creates semantically meaningful chunks with metadata
 This is the MOST IMPORTANT phase for RAG quality
 """
 
-import json
+import os
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Tuple
+import orjson
 import tiktoken
 
+# Approximate cost of the '\n' between clauses when they are joined
+JOIN_TOKENS = 1
+
+@lru_cache(maxsize=None)
+def _get_enc(name: str) -> tiktoken.Encoding:
+    """Load a BPE table once per process, shared by all chunkers"""
+    return tiktoken.get_encoding(name)
+
 class ClauseAwareChunker:
     def __init__(self, target_size: int = 600, overlap: int = 100):
         self.input_path = Path("data/processed/policy_clean.txt")
         self.output_path = Path("data/processed/chunks.json")
         self.target_size = target_size  # tokens
         self.overlap = overlap  # tokens
-        self.encoder = tiktoken.get_encoding("cl100k_base")
+        self.encoder = _get_enc("cl100k_base")
+        self._premium_pat = re.compile(r'PREMIUM (?:TABLE|CHART)')
+        self._digit_pat = re.compile(r'\d+')
+        
+        # Compact JSON unless DEBUG_JSON=1 (nothing downstream needs indents)
+        self.pretty = os.getenv("DEBUG_JSON") == "1"
+        self.json_option = orjson.OPT_INDENT_2 if self.pretty else 0
     
     def load_clean_text(self) -> str:
         """Load cleaned text"""
@@ -29,7 +45,19 @@ class ClauseAwareChunker:
     
     def count_tokens(self, text: str) -> int:
         """Count tokens in text"""
-        return len(self.encoder.encode(text))
+        # Special tokens don't matter for length, so skip that scan
+        return len(self.encoder.encode_ordinary(text))
+    
+    def _approx_tokens(self, s: str) -> int:
+        """Cheap token estimate for fit checks inside the loops
+        (exact counts are only computed for emitted chunks)"""
+        # cl100k splits numbers into 1-3 digit groups, usually with the
+        # separator before each run as its own token; ~4 chars/token otherwise
+        runs = self._digit_pat.findall(s)
+        digit_chars = sum(len(run) for run in runs)
+        digit_tokens = sum((len(run) + 2) // 3 + 1 for run in runs)
+        rest = max(len(s) - digit_chars - len(runs), 0)
+        return digit_tokens + (rest + 3) // 4
     
     def split_into_sections(self, text: str) -> List[Dict]:
         """Split by major sections first"""
@@ -39,34 +67,37 @@ class ClauseAwareChunker:
         parts = re.split(r'(### SECTION: [^#]+###)', text)
         
         current_section = "Introduction"
-        current_text = ""
+        current_buf: List[str] = []  # joined once per section (no += copies)
         
         for part in parts:
             if part.startswith("### SECTION:"):
                 # Save previous section
-                if current_text.strip():
+                current_text = ''.join(current_buf).strip()
+                if current_text:
                     sections.append({
                         'section': current_section,
-                        'text': current_text.strip()
+                        'text': current_text
                     })
                 
                 # Extract new section name
                 current_section = re.search(r'### SECTION: (.+?) ###', part).group(1)
-                current_text = ""
+                current_buf = []
             else:
-                current_text += part
+                current_buf.append(part)
         
         # Add last section
-        if current_text.strip():
+        current_text = ''.join(current_buf).strip()
+        if current_text:
             sections.append({
                 'section': current_section,
-                'text': current_text.strip()
+                'text': current_text
             })
         
         return sections
     
-    def identify_clauses(self, text: str) -> List[str]:
-        """Split text by clauses/subsections"""
+    def identify_clauses(self, text: str) -> Tuple[List[str], List[bool]]:
+        """Split text by clauses/subsections
+        Returns (clauses, per-clause is_premium_table flags)"""
         # Split on:
         # - Bullet points
         # - Numbered items
@@ -75,10 +106,14 @@ class ClauseAwareChunker:
         clauses = []
 
         # If this looks like a premium table, split differently
-        if 'PREMIUM CHART' in text or 'PREMIUM TABLE' in text:
-            # Split by age ranges or plan types
-            parts = re.split(r'\n(?=Age / SI|Indiv\.|2A\n)', text)
-            return [p.strip() for p in parts if p.strip()]
+        if self._premium_pat.search(text):
+            # Split by age ranges or plan types (and where the table starts)
+            parts = re.split(r'\n(?=### PREMIUM TABLE START|Age / SI|Indiv\.|2A\n)', text)
+            clauses = [p.strip() for p in parts if p.strip()]
+            
+            # Flag only clauses holding the marker: a chunk is a premium
+            # table iff its text has one (the marker never spans a split)
+            return clauses, [bool(self._premium_pat.search(c)) for c in clauses]
         
         # First split by bullet points or numbers
         parts = re.split(r'\n(?=•|\d+\.)', text)
@@ -89,13 +124,29 @@ class ClauseAwareChunker:
                 continue
             
             # If still too long, split by sentences
-            if self.count_tokens(part) > self.target_size:
+            if self._approx_tokens(part) > self.target_size:
                 sentences = re.split(r'(?<=[.!?])\s+(?=[A-Z])', part)
                 clauses.extend(sentences)
             else:
                 clauses.append(part)
         
-        return clauses
+        return clauses, [False] * len(clauses)
+    
+    def _build_chunk(self, chunk_id: int, section_name: str,
+                     clauses: List[str], idxs: List[int], table_flags: List[bool]) -> Dict:
+        """Materialize a chunk from a contiguous run of clause indices"""
+        chunk_text = '\n'.join(clauses[idx] for idx in idxs)
+        
+        return {
+            'chunk_id': f"chunk_{chunk_id:04d}",
+            'section': section_name,
+            'text': chunk_text,
+            'token_count': self.count_tokens(chunk_text),
+            'clause_index': f"{idxs[0]}-{idxs[-1]}",
+            # Premium tables are noisy and rarely needed for Q&A
+            # Keep them but mark them
+            'is_premium_table': any(table_flags[idx] for idx in idxs)
+        }
     
     def create_chunks(self, sections: List[Dict]) -> List[Dict]:
         """Create chunks with metadata"""
@@ -107,72 +158,64 @@ class ClauseAwareChunker:
             section_text = section_data['text']
             
             # Identify clauses in this section
-            clauses = self.identify_clauses(section_text)
+            clauses, table_flags = self.identify_clauses(section_text)
+            
+            # Estimated clause sizes drive the grouping decisions
+            clause_toks: List[int] = [self._approx_tokens(clause) for clause in clauses]
             
             # Group clauses into target-sized chunks
-            current_chunk = []
+            # (track clause indices; text is only joined when a chunk is emitted)
+            current_chunk_idxs: List[int] = []
+            carried = 0  # overlap clauses at the front, already emitted
             current_tokens = 0
+            i = 0
             
-            for i, clause in enumerate(clauses):
-                clause_tokens = self.count_tokens(clause)
+            while i < len(clauses) or len(current_chunk_idxs) > carried:
+                # Add clauses while the estimate (incl. the joining newline)
+                # says they fit; a new chunk always takes one new clause
+                join = JOIN_TOKENS if current_chunk_idxs else 0
+                if i < len(clauses) and (
+                    len(current_chunk_idxs) == carried
+                    or current_tokens + join + clause_toks[i] <= self.target_size
+                ):
+                    current_chunk_idxs.append(i)
+                    current_tokens += join + clause_toks[i]
+                    i += 1
+                    continue
                 
-                # If adding this clause exceeds target, save current chunk
-                if current_tokens + clause_tokens > self.target_size and current_chunk:
-                    chunk_text = '\n'.join(current_chunk)
-                    
-                    chunks.append({
-                        'chunk_id': f"chunk_{chunk_id:04d}",
-                        'section': section_name,
-                        'text': chunk_text,
-                        'token_count': self.count_tokens(chunk_text),
-                        'clause_index': f"{i-len(current_chunk)}-{i-1}"
-                    })
-                    
-                    chunk_id += 1
-                    
-                    # Start new chunk with overlap
-                    # Keep last clause for context
-                    if self.overlap > 0 and len(current_chunk) > 0:
-                        current_chunk = [current_chunk[-1], clause]
-                        current_tokens = self.count_tokens('\n'.join(current_chunk))
-                    else:
-                        current_chunk = [clause]
-                        current_tokens = clause_tokens
-                else:
-                    current_chunk.append(clause)
-                    current_tokens += clause_tokens
-            
-            # Save last chunk of section
-            if current_chunk:
-                chunk_text = '\n'.join(current_chunk)
-                chunks.append({
-                    'chunk_id': f"chunk_{chunk_id:04d}",
-                    'section': section_name,
-                    'text': chunk_text,
-                    'token_count': self.count_tokens(chunk_text),
-                    'clause_index': f"{len(clauses)-len(current_chunk)}-{len(clauses)-1}"
-                })
+                # Save current chunk. The estimate can undershoot, so drop
+                # trailing clauses (they are re-queued) until the exact count fits
+                chunk = self._build_chunk(
+                    chunk_id, section_name, clauses, current_chunk_idxs, table_flags
+                )
+                while chunk['token_count'] > self.target_size and len(current_chunk_idxs) > carried + 1:
+                    current_chunk_idxs.pop()
+                    chunk = self._build_chunk(
+                        chunk_id, section_name, clauses, current_chunk_idxs, table_flags
+                    )
+                
+                chunks.append(chunk)
                 chunk_id += 1
-        
-        return chunks
-    
-    def filter_premium_tables(self, chunks: List[Dict]) -> List[Dict]:
-        """Optionally filter out premium table chunks"""
-        # Premium tables are noisy and rarely needed for Q&A
-        # Keep them but mark them
-        
-        for chunk in chunks:
-            if 'PREMIUM TABLE' in chunk['text'] or 'PREMIUM CHART' in chunk['text']:
-                chunk['is_premium_table'] = True
-            else:
-                chunk['is_premium_table'] = False
+                i = current_chunk_idxs[-1] + 1
+                
+                # Start new chunk with overlap
+                # Keep last clause for context
+                if self.overlap > 0 and i < len(clauses):
+                    last = current_chunk_idxs[-1]
+                    current_chunk_idxs = [last]
+                    carried = 1
+                    current_tokens = clause_toks[last]
+                else:
+                    current_chunk_idxs = []
+                    carried = 0
+                    current_tokens = 0
         
         return chunks
     
     def save_chunks(self, chunks: List[Dict]):
         """Save chunks to JSON"""
-        with open(self.output_path, 'w', encoding='utf-8') as f:
-            json.dump(chunks, f, indent=2, ensure_ascii=False)
+        with open(self.output_path, 'wb') as f:
+            f.write(orjson.dumps(chunks, option=self.json_option))
         
         print(f"💾 Saved {len(chunks)} chunks to: {self.output_path}")
         
@@ -214,10 +257,6 @@ class ClauseAwareChunker:
         print(f"\n✂️  Creating chunks (target: {self.target_size} tokens, overlap: {self.overlap})...")
         chunks = self.create_chunks(sections)
         
-        # Filter/mark premium tables
-        print("🏷️  Marking premium table chunks...")
-        chunks = self.filter_premium_tables(chunks)
-        
         # Save
         self.save_chunks(chunks)
         
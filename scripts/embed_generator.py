@@ -4,28 +4,55 @@ Phase 1.5: Embedding Generator
 Generates semantic embeddings using Gemini
 """
 
-import json
+import asyncio
 import os
+from hashlib import blake2b
 from pathlib import Path
-from typing import List, Dict
-import time
+from typing import List, Dict, Literal
+import numpy as np
+import orjson
 from dotenv import load_dotenv
 from google import genai
+from google.genai import errors
 
 # Load environment variables
 load_dotenv()
 
+def quantize_int8(embedding: List[float]) -> Dict:
+    """Symmetric int8 scalar quantization (one scale per vector)"""
+    v = np.asarray(embedding, dtype=np.float32)
+    scale = float(np.abs(v).max()) / 127 or 1.0  # all-zero vector
+    q = np.round(v / scale).astype(np.int8)
+    return {'q': q.tolist(), 'scale': scale}
+
 class EmbeddingGenerator:
-    def __init__(self, skip_premium_tables=True):
+    def __init__(self, skip_premium_tables=True, batch_size=100, max_concurrency=10, max_retries=5, quantize=False,
+                 output_format: Literal["json", "npy"] = "json"):
+        if output_format not in ("json", "npy"):
+            raise ValueError(f"Unknown output_format: {output_format!r} (expected 'json' or 'npy')")
+        if quantize and output_format == "npy":
+            raise ValueError("quantize only applies to output_format='json' (npy is always float16)")
+        
         self.input_path = Path("data/processed/chunks.json")
         self.output_path = Path("data/processed/embeddings.json")
         self.skip_premium_tables = skip_premium_tables
+        self.batch_size = batch_size  # texts per embed_content request
+        self.max_concurrency = max_concurrency  # in-flight requests (rate limit)
+        self.max_retries = max_retries  # retries on 429 before giving up
+        self.quantize = quantize  # store int8 vectors (~4x smaller file)
+        self.output_format = output_format  # Phase 2 (lib/retriever.ts) reads json
+        
+        # Compact JSON unless DEBUG_JSON=1 (Phase 2 never reads indentation)
+        self.pretty = os.getenv("DEBUG_JSON") == "1"
+        self.json_option = orjson.OPT_INDENT_2 if self.pretty else 0
         
         # Initialize Gemini
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment")
         
+        # Recorded per chunk; Phase 2 refuses chunks from another model
+        self.model_name = "text-embedding-004"  # same as lib/constants.ts
         self.client = genai.Client(api_key=api_key)
         print("✅ Gemini API configured")
     
@@ -34,20 +61,73 @@ class EmbeddingGenerator:
         if not self.input_path.exists():
             raise FileNotFoundError(f"Chunks not found: {self.input_path}")
         
-        with open(self.input_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(self.input_path, 'rb') as f:
+            return orjson.loads(f.read())
+    
+    @staticmethod
+    def _is_input_error(e: errors.APIError) -> bool:
+        """True if the request was rejected for its content (payload too
+        large, invalid text), not the API key, permissions or model"""
+        if e.code == 413:
+            return True
+        return e.code == 400 and 'api key' not in (e.message or '').lower()
     
-    def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for a single text chunk"""
-        try:
-            result = self.client.models.embed_content(
-                model="models/text-embedding-004",
-                contents=text
+    async def generate_embeddings_batch(self, texts: List[str], sem: asyncio.Semaphore) -> List[List[float]]:
+        """Generate embeddings for a batch of text chunks in one request"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with sem:
+                    result = await self.client.aio.models.embed_content(
+                        model=f"models/{self.model_name}",
+                        contents=texts
+                    )
+                return [e.values for e in result.embeddings]
+            except errors.APIError as e:
+                # Rate limited: back off exponentially, outside the semaphore
+                if e.code == 429 and attempt < self.max_retries:
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                # A bad input (e.g. one oversized text) rejects the whole
+                # request: split it so only the offending texts get None.
+                # Auth/model errors fail every split too, so give up at once
+                if self._is_input_error(e) and len(texts) > 1:
+                    mid = len(texts) // 2
+                    first, second = await asyncio.gather(
+                        self.generate_embeddings_batch(texts[:mid], sem),
+                        self.generate_embeddings_batch(texts[mid:], sem),
+                    )
+                    return first + second
+                print(f"⚠️  Error generating embeddings: {e}")
+                return [None] * len(texts)
+            except Exception as e:
+                print(f"⚠️  Error generating embeddings: {e}")
+                return [None] * len(texts)
+    
+    async def _embed_chunks(self, chunks: List[Dict]) -> List[List[float]]:
+        """Embed chunks in batches, capped at max_concurrency requests"""
+        sem = asyncio.Semaphore(self.max_concurrency)
+        total = len(chunks)
+        done = 0
+        
+        async def embed_batch(batch: List[Dict]) -> List[List[float]]:
+            nonlocal done
+            embeddings = await self.generate_embeddings_batch(
+                [chunk['text'] for chunk in batch], sem
             )
-            return result.embeddings[0].values
-        except Exception as e:
-            print(f"⚠️  Error generating embedding: {e}")
-            return None
+            
+            # Progress indicator
+            done += len(batch)
+            print(f"✅ Progress: {done}/{total} chunks")
+            
+            return embeddings
+        
+        batches = [
+            chunks[start:start + self.batch_size]
+            for start in range(0, total, self.batch_size)
+        ]
+        results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+        
+        return [embedding for batch_result in results for embedding in batch_result]
     
     def generate_all_embeddings(self, chunks: List[Dict]) -> List[Dict]:
         """Generate embeddings for all chunks with progress tracking"""
@@ -57,15 +137,34 @@ class EmbeddingGenerator:
         print(f"\n🔄 Generating embeddings for {total} chunks...")
         print("⏱️  This may take a few minutes...\n")
         
+        to_embed = []
         for i, chunk in enumerate(chunks, 1):
             # Skip premium tables if desired
             if self.skip_premium_tables and chunk.get('is_premium_table', False):
                 print(f"⏭️  Skipping premium table chunk {i}/{total}")
                 continue
-            
-            # Generate embedding
-            embedding = self.generate_embedding(chunk['text'])
-            
+            to_embed.append(chunk)
+        
+        # Embed each distinct text once (repeated boilerplate, table rows)
+        seen: Dict[bytes, int] = {}
+        unique_chunks = []
+        unique_refs = []
+        for chunk in to_embed:
+            h = blake2b(chunk['text'].encode(), digest_size=16).digest()
+            if h not in seen:
+                seen[h] = len(unique_chunks)
+                unique_chunks.append(chunk)
+            unique_refs.append(seen[h])
+        
+        if len(unique_chunks) < len(to_embed):
+            print(f"♻️  Reusing embeddings for {len(to_embed) - len(unique_chunks)} duplicate chunks")
+        
+        # Generate embeddings (results come back in input order)
+        unique_embeddings = asyncio.run(self._embed_chunks(unique_chunks))
+        
+        embeddings = [unique_embeddings[ref] for ref in unique_refs]
+        
+        for chunk, embedding in zip(to_embed, embeddings):
             if embedding:
                 embeddings_data.append({
                     'chunk_id': chunk['chunk_id'],
@@ -74,27 +173,58 @@ class EmbeddingGenerator:
                     'token_count': chunk['token_count'],
                     'embedding': embedding,
                     'embedding_dim': len(embedding),
+                    'embedding_model': self.model_name,
                     'is_premium_table': chunk.get('is_premium_table', False),
                     'priority': 'low' if chunk.get('is_premium_table') else 'high'
                 })
-                
-                # Progress indicator
-                if i % 10 == 0:
-                    print(f"✅ Progress: {i}/{total} chunks")
             else:
                 print(f"❌ Failed to embed chunk {chunk['chunk_id']}")
-            
-            # Rate limiting
-            time.sleep(0.5)
         
         return embeddings_data
     
     def save_embeddings(self, embeddings: List[Dict]):
-        """Save embeddings to JSON file"""
-        with open(self.output_path, 'w', encoding='utf-8') as f:
-            json.dump(embeddings, f, indent=2, ensure_ascii=False)
+        """Save embeddings to JSON (default) or a float16 .npy matrix"""
+        if self.output_format == "npy":
+            # Vectors as one float16 matrix, everything else in a JSON index
+            # (row i is entry i; np.load(path, mmap_mode='r') maps it lazily)
+            saved_path = self.output_path.with_suffix('.npy')
+            mat = np.stack([e['embedding'] for e in embeddings]).astype(np.float16)
+            np.save(saved_path, mat)
+            
+            index_path = self.output_path.with_name('embeddings_index.json')
+            index = [{k: v for k, v in e.items() if k != 'embedding'} for e in embeddings]
+            
+            with open(index_path, 'wb') as f:
+                f.write(orjson.dumps(index, option=self.json_option))
+            
+            print(f"\n🗂️  Saved embedding index to: {index_path}")
+            
+            # Don't leave an older JSON export for Phase 2 to pick up
+            self.output_path.unlink(missing_ok=True)
+        else:
+            saved_path = self.output_path
+            
+            # Likewise drop an older npy export so the two never disagree
+            self.output_path.with_suffix('.npy').unlink(missing_ok=True)
+            self.output_path.with_name('embeddings_index.json').unlink(missing_ok=True)
+            
+            # Stream one record at a time instead of serializing the whole list
+            with open(saved_path, 'wb') as f:
+                f.write(b'[\n')
+                for i, e in enumerate(embeddings):
+                    if self.quantize:
+                        # Replace float vector with int8 + scale (dequantized in lib/retriever.ts)
+                        quantized = quantize_int8(e['embedding'])
+                        e = {k: v for k, v in e.items() if k != 'embedding'}
+                        e['embedding_q8'] = quantized['q']
+                        e['embedding_scale'] = quantized['scale']
+                    
+                    if i:
+                        f.write(b',\n')
+                    f.write(orjson.dumps(e, option=self.json_option))
+                f.write(b'\n]\n')
         
-        print(f"\n💾 Saved {len(embeddings)} embeddings to: {self.output_path}")
+        print(f"\n💾 Saved {len(embeddings)} embeddings to: {saved_path}")
         
         # Create metadata file
         metadata_path = Path("data/processed/chunks_metadata.json")
@@ -104,13 +234,14 @@ class EmbeddingGenerator:
                 'section': e['section'],
                 'text_preview': e['text'][:200] + "...",
                 'token_count': e['token_count'],
-                'embedding_dim': e['embedding_dim']
+                'embedding_dim': e['embedding_dim'],
+                'embedding_model': e['embedding_model']
             }
             for e in embeddings
         ]
         
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        with open(metadata_path, 'wb') as f:
+            f.write(orjson.dumps(metadata, option=self.json_option))
         
         print(f"📋 Saved metadata to: {metadata_path}")
         
@@ -120,7 +251,7 @@ class EmbeddingGenerator:
         print(f"   Embedding dimension: {embeddings[0]['embedding_dim']}")
         print(f"   Total tokens: {sum(e['token_count'] for e in embeddings):,}")
         
-        file_size = self.output_path.stat().st_size / (1024 * 1024)
+        file_size = saved_path.stat().st_size / (1024 * 1024)
         print(f"   File size: {file_size:.2f} MB")
     
     def generate(self):
@@ -151,7 +282,10 @@ def main():
         print("3. Get your key from: https://aistudio.google.com/app/apikey")
         return
     
-    generator = EmbeddingGenerator()
+    generator = EmbeddingGenerator(
+        quantize=os.getenv("QUANTIZE_EMBEDDINGS") == "1",
+        output_format=os.getenv("EMBEDDING_FORMAT", "json")
+    )
     generator.generate()
 
 if __name__ == "__main__":
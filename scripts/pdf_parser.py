@@ -5,34 +5,75 @@ Extracts clean text from ICICI Lombard Health Policy PDF
 Preserves structure, removes noise
 """
 
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from pypdf import PdfReader
+import fitz  # PyMuPDF
+
+def _extract_page(pdf_path: str, page_idx: int) -> tuple:
+    """Extract text from a single page (runs inside a worker process)"""
+    with fitz.open(pdf_path) as doc:
+        # "text" mode keeps the same flat layout pypdf produced
+        return page_idx, doc[page_idx].get_text("text")
 
 class PolicyPDFParser:
     def __init__(self, pdf_path: str):
         self.pdf_path = Path(pdf_path)
         self.output_path = Path("data/processed/policy_raw.txt")
         
+        # Precompile cleanup and section patterns once
+        self._footer_pat = re.compile(r'ICICI\s+LOMBARD.*?(?=\n)', re.IGNORECASE)
+        self._page_num_pat = re.compile(r'\n\d+\n')
+        self._gst_pat = re.compile(r'Rates are (?:in|ex)clusive of GST.*?\n', re.IGNORECASE)
+        self._blank_lines_pat = re.compile(r'\n{3,}')
+        
+        # Identify major sections and mark them
+        self._section_pats = [
+            (re.compile(pattern, re.IGNORECASE), replacement)
+            for pattern, replacement in [
+                (r'\n(Key Points To Note:)', r'\n\n### SECTION: KEY POINTS ###\n\1'),
+                (r'\n(Major Permanent Exclusions)', r'\n\n### SECTION: EXCLUSIONS ###\n\1'),
+                (r'\n(How Do I Make A Claim\?)', r'\n\n### SECTION: CLAIMS PROCESS ###\n\1'),
+                (r'\n(Health Insurance FAQs)', r'\n\n### SECTION: FAQs ###\n\1'),
+                (r'\n(Plan Name\s+Health \w+)', r'\n\n### SECTION: PLAN DETAILS ###\n\1'),
+            ]
+        ]
+        
     def extract_text(self) -> str:
         """Extract all text from PDF page by page"""
         print(f"📄 Reading PDF: {self.pdf_path}")
         
         try:
-            reader = PdfReader(str(self.pdf_path))
-            total_pages = len(reader.pages)
+            with fitz.open(str(self.pdf_path)) as doc:
+                total_pages = doc.page_count
             print(f"📊 Total pages: {total_pages}")
             
-            all_text = []
+            page_texts = {}
             
-            for i, page in enumerate(reader.pages, 1):
-                text = page.extract_text()
-                
-                # Add page marker for debugging (will be removed later)
-                all_text.append(f"\n[PAGE {i}]\n{text}")
-                
-                if i % 10 == 0:
-                    print(f"⏳ Processed {i}/{total_pages} pages...")
+            # Small PDFs aren't worth the process start-up cost
+            if total_pages <= 8:
+                for idx in range(total_pages):
+                    _, page_texts[idx] = _extract_page(str(self.pdf_path), idx)
+            else:
+                with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                    futures = [
+                        executor.submit(_extract_page, str(self.pdf_path), idx)
+                        for idx in range(total_pages)
+                    ]
+                    
+                    for done, future in enumerate(as_completed(futures), 1):
+                        idx, text = future.result()
+                        page_texts[idx] = text
+                        
+                        if done % 10 == 0:
+                            print(f"⏳ Processed {done}/{total_pages} pages...")
+            
+            # Add page marker for debugging (will be removed later)
+            all_text = [
+                f"\n[PAGE {idx + 1}]\n{page_texts[idx]}"
+                for idx in sorted(page_texts)
+            ]
             
             print(f"✅ Extracted text from all {total_pages} pages")
             return "\n".join(all_text)
@@ -45,33 +86,24 @@ class PolicyPDFParser:
         """Remove repeated headers, footers, page numbers"""
         
         # Remove common footer patterns
-        text = re.sub(r'ICICI\s+LOMBARD.*?(?=\n)', '', text, flags=re.IGNORECASE)
+        text = self._footer_pat.sub('', text)
         
         # Remove standalone page numbers
-        text = re.sub(r'\n\d+\n', '\n', text)
+        text = self._page_num_pat.sub('\n', text)
         
         # Remove "Rates are exclusive of GST" repeated lines
-        text = re.sub(r'Rates are (?:in|ex)clusive of GST.*?\n', '', text, flags=re.IGNORECASE)
+        text = self._gst_pat.sub('', text)
         
         # Remove multiple blank lines
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        text = self._blank_lines_pat.sub('\n\n', text)
         
         return text
     
     def preserve_structure(self, text: str) -> str:
         """Mark important sections clearly"""
         
-        # Identify major sections and mark them
-        section_patterns = [
-            (r'\n(Key Points To Note:)', r'\n\n### SECTION: KEY POINTS ###\n\1'),
-            (r'\n(Major Permanent Exclusions)', r'\n\n### SECTION: EXCLUSIONS ###\n\1'),
-            (r'\n(How Do I Make A Claim\?)', r'\n\n### SECTION: CLAIMS PROCESS ###\n\1'),
-            (r'\n(Health Insurance FAQs)', r'\n\n### SECTION: FAQs ###\n\1'),
-            (r'\n(Plan Name\s+Health \w+)', r'\n\n### SECTION: PLAN DETAILS ###\n\1'),
-        ]
-        
-        for pattern, replacement in section_patterns:
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+        for pattern, replacement in self._section_pats:
+            text = pattern.sub(replacement, text)
         
         return text
     
@@ -5,13 +5,79 @@ Normalizes extracted text for LLM consumption
 Merges broken sentences, standardizes formatting
 """
 
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import List
+
+# Whitespace, bullet, broken-line and currency fixes fused into one
+# alternation so the text is scanned once (see TextCleaner.normalize_text).
+# `nl` leaves the last newline of a run unconsumed so a bullet right after
+# it still matches. Module level so worker processes compile it on import.
+_FUSED_PAT = re.compile(
+    r'(?P<ws> {2,})'
+    r'|(?P<nl>\n{2,}(?=\n))'
+    r'|(?P<bullet>\n[•●○-]\s*)'
+    r'|(?P<broken>[a-z,]\n[a-z])'
+    r'|(?P<currency>`\s+\d)'
+)
+
+# Safe places to split for parallel normalization: after a blank-line run
+# and before a char that can't continue a match (not space, digit or
+# bullet), so no fused pattern can match across two pieces
+_SPLIT_PAT = re.compile(r'(?<=\n\n\n)(?=[^\s\d•●○-])')
+
+# Below this a worker pool costs more than it saves
+MIN_PIECE_CHARS = 4_000_000
+
+def _route(m: re.Match) -> str:
+    """Replacement for whichever branch of _FUSED_PAT matched"""
+    kind = m.lastgroup
+    found = m.group(kind)
+    
+    if kind == 'ws':
+        return ' '
+    if kind == 'nl':
+        return '\n'
+    if kind == 'bullet':
+        return '\n• '
+    if kind == 'broken':
+        return f"{found[0]} {found[2]}"
+    # currency
+    return '₹' + found[-1]
+
+def _normalize_piece(piece: str) -> str:
+    """Run the fused normalization on one piece (inside a worker process)"""
+    return _FUSED_PAT.sub(_route, piece)
 
 class TextCleaner:
     def __init__(self):
         self.input_path = Path("data/processed/policy_raw.txt")
         self.output_path = Path("data/processed/policy_clean.txt")
+        
+        # Precompile every pattern once instead of per call
+        self._page_pat = re.compile(r'\[PAGE \d+\]')
+        
+        self._premium_pat = re.compile(
+            r'(HEALTH \w+ PLUS - PREMIUM CHART)', re.IGNORECASE
+        )
+        
+        # Topic markers, skipping text already under a section marker
+        topic_patterns = {
+            'COVERAGE': r'(The Coverage Entails:|Coverage up to)',
+            'WAITING_PERIOD': r'(waiting period|PED waiting period)',
+            'EXCLUSIONS': r'(What We Will Not Pay|Exclusions?)',
+            'BENEFITS': r'(Unlimited Reset Benefit|ASI Protector)',
+            'CLAIMS': r'(How Do I Make A Claim|Claim Service Guarantee)',
+        }
+        self._topic_pats = [
+            (
+                re.compile(f'(?<!### SECTION: )({pattern})', re.IGNORECASE),
+                r'### TOPIC: ' + section_type + r' ###\n\1',
+            )
+            for section_type, pattern in topic_patterns.items()
+        ]
     
     def load_raw_text(self) -> str:
         """Load the raw extracted text"""
@@ -23,51 +89,58 @@ class TextCleaner:
     
     def remove_page_markers(self, text: str) -> str:
         """Remove [PAGE N] markers added during extraction"""
-        return re.sub(r'\[PAGE \d+\]', '', text)
+        return self._page_pat.sub('', text)
     
-    def normalize_whitespace(self, text: str) -> str:
-        """Fix spacing issues"""
-        # Remove extra spaces
-        text = re.sub(r' {2,}', ' ', text)
-        
-        # Fix newlines around bullet points
-        text = re.sub(r'\n•\s*', '\n• ', text)
-        text = re.sub(r'\n-\s*', '\n- ', text)
-        
-        # Normalize line breaks (max 2 consecutive)
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        
-        return text.strip()
-    
-    def merge_broken_sentences(self, text: str) -> str:
-        """Fix sentences split across lines"""
-        # Common pattern: line ends without punctuation
-        # Next line starts with lowercase
-        text = re.sub(r'([a-z,])\n([a-z])', r'\1 \2', text)
-        
-        # Fix currency symbols split from numbers
-        text = re.sub(r'`\s+(\d)', r'₹\1', text)
-        
-        return text
+    def split_pieces(self, text: str, n_pieces: int = 16,
+                     min_piece_chars: int = MIN_PIECE_CHARS) -> List[str]:
+        """Split text into ~n_pieces at safe boundaries (see _SPLIT_PAT)"""
+        target = max(len(text) // n_pieces, min_piece_chars)
+        pieces = []
+        start = 0
+        
+        for m in _SPLIT_PAT.finditer(text):
+            if m.start() - start >= target:
+                pieces.append(text[start:m.start()])
+                start = m.start()
+        
+        pieces.append(text[start:])
+        return pieces
     
-    def standardize_bullets(self, text: str) -> str:
-        """Standardize bullet point formats"""
-        # Convert various bullet styles to consistent format
-        text = re.sub(r'\n[•●○]\s*', '\n• ', text)
-        text = re.sub(r'\n-\s+', '\n• ', text)
-        
-        return text
+    def normalize_text(self, text: str) -> str:
+        """Fix spacing, bullets, broken sentences and split currency"""
+        # One pass over the text does all of:
+        # - collapse runs of spaces; max 2 consecutive line breaks
+        # - bullets (•, ●, ○, -) become '• ' at line start
+        # - line ends without punctuation + next starts lowercase -> join
+        # - '` 500' -> '₹500'
+        # Bullets are only rewritten after a newline, so after the final
+        # strip a bullet at the very start or end of the text is also
+        # normalized (the old multi-pass version left '-'/'●' there as is)
+        cpus = os.cpu_count() or 1
+        
+        # Large texts on multi-core machines: normalize pieces in parallel
+        # (re holds the GIL, so this needs processes, not threads)
+        pieces = [text]
+        if cpus > 1 and len(text) >= 2 * MIN_PIECE_CHARS:
+            pieces = self.split_pieces(text, n_pieces=cpus)
+        
+        if len(pieces) > 1:
+            with ProcessPoolExecutor(max_workers=len(pieces)) as executor:
+                text = ''.join(executor.map(_normalize_piece, pieces))
+        else:
+            text = _normalize_piece(text)
+        
+        # Stripping is global: only the ends of the whole text count
+        return text.strip()
     
     def clean_premium_tables(self, text: str) -> str:
         """Mark premium table sections clearly"""
         # These tables are important but noisy
         # Mark them for potential filtering during chunking
         
-        text = re.sub(
-            r'(HEALTH \w+ PLUS - PREMIUM CHART)',
+        text = self._premium_pat.sub(
             r'\n### PREMIUM TABLE START ###\n\1',
-            text,
-            flags=re.IGNORECASE
+            text
         )
         
         return text
@@ -76,22 +149,9 @@ class TextCleaner:
         """Improve section identification"""
         
         # Mark coverage sections
-        patterns = {
-            'COVERAGE': r'(The Coverage Entails:|Coverage up to)',
-            'WAITING_PERIOD': r'(waiting period|PED waiting period)',
-            'EXCLUSIONS': r'(What We Will Not Pay|Exclusions?)',
-            'BENEFITS': r'(Unlimited Reset Benefit|ASI Protector)',
-            'CLAIMS': r'(How Do I Make A Claim|Claim Service Guarantee)',
-        }
-        
-        for section_type, pattern in patterns.items():
-            # Don't modify existing section markers
-            text = re.sub(
-                f'(?<!### SECTION: )({pattern})',
-                r'### TOPIC: ' + section_type + r' ###\n\1',
-                text,
-                flags=re.IGNORECASE
-            )
+        # (lookbehind in each pattern leaves existing section markers alone)
+        for pattern, replacement in self._topic_pats:
+            text = pattern.sub(replacement, text)
         
         return text
     
@@ -119,9 +179,8 @@ class TextCleaner:
         # Clean step by step
         steps = [
             ("Removing page markers", self.remove_page_markers),
-            ("Normalizing whitespace", self.normalize_whitespace),
-            ("Merging broken sentences", self.merge_broken_sentences),
-            ("Standardizing bullets", self.standardize_bullets),
+            # Page markers go first: removing them joins newline runs
+            ("Normalizing whitespace, sentences and bullets", self.normalize_text),
             ("Cleaning premium tables", self.clean_premium_tables),
             ("Enhancing section markers", self.enhance_section_markers),
         ]